@@ -0,0 +1,270 @@
+"""
+Modo bajo consumo (BAJO_CONSUMO = True en main.py): entre una muestra y la
+siguiente el ESP32 queda en deep sleep con el estado en la memoria RTC, y el
+módem duerme con PSM / eDRX / DTR. main.py lo importa solo con la opción
+activa, así que sin ella no ocupa RAM
+"""
+
+from machine import RTC, deepsleep
+import time
+import json
+import struct
+
+try:
+    import uasyncio as asyncio
+except ImportError:
+    import asyncio
+
+try:
+    import esp32
+except ImportError:
+    esp32 = None
+
+fw = None   # Programa principal (main.py); lo asigna main.py al importar este módulo
+
+# ═══════════════════════════════════════════════
+# MEMORIA RTC
+# ═══════════════════════════════════════════════
+# Little-endian:
+#   B versión | B RTS/CTS | B lecturas en el lote | b RSSI | I count |
+#   I baudios | I ms dormido | I edad del último reporte (0xFFFFFFFF = ninguno) |
+#   H ciclos | H mensajes | I ms despierto | I ms con el módem despierto
+#   i x 3 último valor reportado (décimas)
+#   por lectura: I edad en ms | i x 3 valores (décimas)
+# Las edades se miden al dormir; al despertar se les suma el tiempo dormido
+_RTC_VERSION = 1
+_RTC_CABECERA = "<BBBbIIIIHHII"
+_RTC_CABECERA_LEN = struct.calcsize(_RTC_CABECERA)
+_RTC_LECTURA_LEN = 16
+_SIN_REPORTE = 0xFFFFFFFF
+
+# Consumo acumulado desde el último reporte de energía
+energia_ciclos = 0
+energia_mensajes = 0
+energia_despierto_ms = 0
+energia_modem_ms = 0
+_despierto_desde = None   # Arranque de este ciclo (ticks_ms); lo fija ciclo()
+_modem_desde = None       # Desde cuándo está despierto el módem (None = durmiendo)
+
+def rtc_guardar(dormir_ms):
+    """Guardar en la memoria RTC lo que tiene que sobrevivir al deep sleep"""
+    ahora = time.ticks_ms()
+    if fw._ultimo_reporte_ms is None:
+        edad_reporte = _SIN_REPORTE
+    else:
+        edad_reporte = time.ticks_diff(ahora, fw._ultimo_reporte_ms)
+    lote_n = fw._lote_n
+    buf = bytearray(_RTC_CABECERA_LEN + 12 + _RTC_LECTURA_LEN * lote_n)
+    struct.pack_into(_RTC_CABECERA, buf, 0, _RTC_VERSION, fw.uart_flujo, lote_n,
+                     -128 if fw.senal_rssi is None else fw.senal_rssi, fw.count, fw.uart_baud,
+                     dormir_ms, edad_reporte, energia_ciclos, energia_mensajes,
+                     energia_despierto_ms, energia_modem_ms)
+    pos = _RTC_CABECERA_LEN
+    for campo in fw.BANDA_MUERTA:
+        struct.pack_into("<i", buf, pos, fw.decimas(fw._ultimo_reportado.get(campo)))
+        pos += 4
+    lote_t = fw._lote_t
+    lote_v = fw._lote_v
+    for k in range(lote_n):
+        i = (fw._lote_inicio + k) % fw.BATCH_SIZE
+        struct.pack_into("<Iiii", buf, pos, time.ticks_diff(ahora, lote_t[i]),
+                         lote_v[3 * i], lote_v[3 * i + 1], lote_v[3 * i + 2])
+        pos += _RTC_LECTURA_LEN
+    RTC().memory(buf)
+
+def rtc_restaurar():
+    """Recuperar el estado guardado antes del deep sleep.
+    Retorna False si la memoria RTC no tiene un estado válido"""
+    global energia_ciclos, energia_mensajes, energia_despierto_ms, energia_modem_ms
+    buf = RTC().memory()
+    if len(buf) < _RTC_CABECERA_LEN + 12 or buf[0] != _RTC_VERSION:
+        return False
+    (_, flujo, n, rssi, fw.count, baud, dormido, edad_reporte, energia_ciclos,
+     energia_mensajes, energia_despierto_ms, energia_modem_ms) = struct.unpack_from(_RTC_CABECERA, buf, 0)
+    # Instante en que se durmió, en el reloj de este arranque: ticks_ms()
+    # vuelve a 0 al despertar, así que desde entonces pasaron el sueño más
+    # lo que lleva este arranque (ticks_ms() ahora)
+    ahora = time.ticks_ms()
+    base = time.ticks_add(ahora, -(dormido + ahora))
+
+    fw._uart_configurar(baud, bool(flujo))
+    fw.senal_rssi = None if rssi == -128 else rssi
+    if fw.senal_adaptativa:
+        fw.senal_adaptativa.clasificar()
+
+    pos = _RTC_CABECERA_LEN
+    for campo in fw.BANDA_MUERTA:
+        v = struct.unpack_from("<i", buf, pos)[0]
+        pos += 4
+        if edad_reporte != _SIN_REPORTE:
+            fw._ultimo_reportado[campo] = None if v == fw.NULO else v / 10
+    if edad_reporte != _SIN_REPORTE:
+        fw._ultimo_reporte_ms = time.ticks_add(base, -edad_reporte)
+
+    lote_t = fw._lote_t
+    lote_v = fw._lote_v
+    lote_n = min(n, fw.BATCH_SIZE, (len(buf) - pos) // _RTC_LECTURA_LEN)
+    for i in range(lote_n):
+        edad, t, h, p = struct.unpack_from("<Iiii", buf, pos)
+        pos += _RTC_LECTURA_LEN
+        lote_t[i] = time.ticks_add(base, -edad)
+        lote_v[3 * i] = t
+        lote_v[3 * i + 1] = h
+        lote_v[3 * i + 2] = p
+    fw._lote_inicio = 0
+    fw._lote_n = lote_n
+    print(f"💤 Despertando: mensaje #{fw.count}, {lote_n} lecturas en el lote")
+    return True
+
+# ═══════════════════════════════════════════════
+# MÓDEM: PSM / eDRX / DTR
+# ═══════════════════════════════════════════════
+# Unidades de los temporizadores PSM: (bits, segundos) de menor a mayor
+_T3412_UNIDADES = ((0b011, 2), (0b100, 30), (0b101, 60), (0b000, 600),
+                   (0b001, 3600), (0b010, 36000), (0b110, 1152000))
+_T3324_UNIDADES = ((0b000, 2), (0b001, 60), (0b010, 360))
+
+def _temporizador_3gpp(segundos, unidades):
+    """Codificar un temporizador GPRS (3GPP TS 24.008) como los 8 bits que
+    pide AT+CPSMS: 3 de unidad y 5 de valor, redondeando hacia arriba"""
+    for bits, paso in unidades:
+        n = -(-segundos // paso)
+        if n < 32:
+            return f"{bits:03b}{n:05b}"
+    return f"{unidades[-1][0]:03b}11111"
+
+async def modem_bajo_consumo():
+    """Pedir a la red los temporizadores PSM y eDRX y dejar que el módem
+    duerma mientras DTR esté en alto"""
+    print("\n🔋 Configurando bajo consumo del módem...")
+    if fw.PSM_TAU_S:
+        tau = _temporizador_3gpp(fw.PSM_TAU_S, _T3412_UNIDADES)
+        activo = _temporizador_3gpp(fw.PSM_ACTIVO_S, _T3324_UNIDADES)
+        if "OK" not in await fw.send_at(f'AT+CPSMS=1,,,"{tau}","{activo}"', fw.AT_TIMEOUT_MS, False):
+            print("⚠️  El módem no aceptó PSM")
+    if fw.EDRX_CICLO:
+        if "OK" not in await fw.send_at(f'AT+CEDRXS=1,4,"{fw.EDRX_CICLO}"', fw.AT_TIMEOUT_MS, False):
+            print("⚠️  El módem no aceptó eDRX")
+    if "OK" not in await fw.send_at("AT+CSCLK=1", fw.AT_TIMEOUT_MS, False):
+        print("⚠️  El módem no acepta dormir con DTR")
+
+async def modem_despertar():
+    """Bajar DTR para sacar al módem del sleep. Si no contesta puede estar en
+    PSM, de donde sale con un pulso en PWRKEY (si estaba apagado, lo enciende)"""
+    global _modem_desde
+    _modem_desde = time.ticks_ms()
+    fw.dtr.value(0)
+    await asyncio.sleep_ms(fw.MODEM_DTR_DESPERTAR_MS)
+    if await fw.modem_responde(3, 300):
+        return
+    print("💤 El módem no responde con DTR, pulso en PWRKEY")
+    await fw._pwrkey_pulsar()
+
+def modem_dormir():
+    """Subir DTR: con AT+CSCLK=1 el módem duerme en cuanto la UART queda quieta"""
+    global energia_modem_ms, _modem_desde
+    fw.dtr.value(1)
+    if _modem_desde is not None:
+        energia_modem_ms += time.ticks_diff(time.ticks_ms(), _modem_desde)
+        _modem_desde = None
+
+# ═══════════════════════════════════════════════
+# CICLO: MUESTRA, PUBLICACIÓN Y DEEP SLEEP
+# ═══════════════════════════════════════════════
+async def publicar_metricas_energia():
+    """Reportar el tiempo despierto por mensaje de los últimos ciclos"""
+    global energia_ciclos, energia_mensajes, energia_despierto_ms, energia_modem_ms
+    global _despierto_desde, _modem_desde
+    ahora = time.ticks_ms()
+    despierto = energia_despierto_ms + time.ticks_diff(ahora, _despierto_desde)
+    modem = energia_modem_ms + time.ticks_diff(ahora, _modem_desde)
+    metricas = {
+        "device_id": fw.DEVICE_ID,
+        "evento": "energia",
+        "ciclos": energia_ciclos,
+        "mensajes": energia_mensajes,
+        "despierto_ms": despierto,
+        "modem_ms": modem,
+        "despierto_ms_por_mensaje": despierto // energia_mensajes,
+        "modem_ms_por_mensaje": modem // energia_mensajes,
+        "pendientes": fw.cola_pendientes(),
+        "rssi": fw.senal_rssi,
+    }
+    if await fw.mqtt_publish(fw.TOPIC_METRICAS, json.dumps(metricas)) is None:
+        return
+    # Lo que resta de este ciclo cuenta para el próximo reporte
+    energia_ciclos = energia_mensajes = energia_despierto_ms = energia_modem_ms = 0
+    _despierto_desde = _modem_desde = ahora
+
+async def publicar():
+    """Despertar el módem, retomar la sesión y publicar lo pendiente, con
+    BAJO_CONSUMO_CONEXION_MAX_MS como límite"""
+    global energia_mensajes
+    if _modem_desde is None:
+        await modem_despertar()
+    inicio = time.ticks_ms()
+    antes = fw._pend_n + fw.cola_pendientes()
+    for _ in range(2):
+        if not fw._mqtt_conectado or fw._fallos_publicacion:
+            restante = fw.BAJO_CONSUMO_CONEXION_MAX_MS - time.ticks_diff(time.ticks_ms(), inicio)
+            if restante <= 0 or await fw.reconectar("despertar", restante) is None:
+                break
+        ok = True
+        while ok and fw._pend_n:
+            payload = fw._pendiente_tomar()
+            ok = await fw.publicar_o_encolar(payload, fw._pend_tomado)
+        if ok and fw.cola_pendientes():
+            await fw.cola_drenar()
+            ok = fw.cola_pendientes() == 0
+        if ok:
+            break
+        # La sesión pudo vencer mientras el módem estaba en PSM: forzar re-CONNECT
+        fw._fallos_publicacion = fw.PUB_FALLOS_MAX
+
+    # Lo que no salió espera en la flash al próximo ciclo
+    fw._pendientes_a_cola()
+    energia_mensajes += antes - fw.cola_pendientes()
+    if fw._mqtt_conectado and energia_mensajes and energia_mensajes >= fw.ENERGIA_REPORTE_MENSAJES:
+        await publicar_metricas_energia()
+
+async def dormir():
+    """Dormir el módem y el ESP32 hasta la próxima muestra. No retorna"""
+    global energia_despierto_ms
+    modem_dormir()
+    periodo = fw.SAMPLE_INTERVAL if fw.BATCH_MODE else fw.PUBLISH_INTERVAL
+    ahora = time.ticks_ms()
+    arranque = fw._T_ARRANQUE
+    # La cadencia se cuenta desde que despertó, no desde que terminó
+    ms = max(100, periodo - time.ticks_diff(ahora, arranque))
+    energia_despierto_ms += time.ticks_diff(ahora, _despierto_desde)
+    rtc_guardar(ms)
+    print(f"😴 Deep sleep {ms} ms (despierto {time.ticks_diff(ahora, arranque)} ms)")
+    fw.led.off()
+    if fw.oled_disponible:
+        try:
+            fw.oled.poweroff()
+        except Exception:
+            pass
+    # Sin retención los pines quedan flotando: el módem se apagaría
+    # (POWER_EN) o se despertaría (DTR)
+    for pin in (fw.pwrkey, fw.power_en, fw.dtr):
+        pin.init(hold=True)
+    if esp32 is not None:
+        esp32.gpio_deep_sleep_hold(True)
+    deepsleep(ms)
+
+async def ciclo(modem_despierto=False):
+    """Una ventana de muestreo: leer, publicar solo si hay algo listo y
+    volver a dormir. No retorna"""
+    global energia_ciclos, _despierto_desde, _modem_desde
+    energia_ciclos += 1
+    if _despierto_desde is None:
+        _despierto_desde = fw._T_ARRANQUE
+    if modem_despierto:
+        _modem_desde = fw._T_ARRANQUE
+    fw.procesar_lectura()
+    fw.oled_show("Bajo consumo", f"Lote {fw._lote_n}/{fw.lote_objetivo()}",
+                 f"Cola:{fw.cola_pendientes()}", f"Msg #{fw.count - 1}")
+    if fw._pend_n or (fw.cola_pendientes() and _modem_desde is not None):
+        await publicar()
+    await dormir()
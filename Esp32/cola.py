@@ -0,0 +1,160 @@
+"""
+Cola en flash (store-and-forward) para los mensajes que no se pudieron
+publicar. main.py lo importa recién cuando hay una cola que recuperar o un
+mensaje que guardar: con el enlace sano no se carga
+"""
+
+import os
+import struct
+
+fw = None   # Programa principal (main.py); lo asigna main.py al importar este módulo
+
+# cola.dat: registros [seq u32][largo u16][payload] solo agregados al final.
+# cola.ptr: offset del registro pendiente más antiguo (4 bytes).
+# Encolar solo agrega al final y desencolar solo reescribe el puntero.
+_HDR = "<IH"
+_HDR_LEN = 6
+
+_cabeza = 0   # Offset del registro pendiente más antiguo
+_fin = 0      # Offset del final del último registro completo
+_n = 0        # Mensajes pendientes
+
+def _guardar_cabeza():
+    with open(fw.COLA_PUNTERO, "wb") as f:
+        f.write(struct.pack("<I", _cabeza))
+
+def _borrar():
+    global _cabeza, _fin, _n
+    for archivo in (fw.COLA_ARCHIVO, fw.COLA_PUNTERO):
+        try:
+            os.remove(archivo)
+        except OSError:
+            pass
+    _cabeza = _fin = _n = 0
+
+def _compactar():
+    """Reescribir solo los registros pendientes (descarta lo ya enviado)"""
+    global _cabeza, _fin
+    archivo = fw.COLA_ARCHIVO
+    tmp = archivo + ".tmp"
+    buf = bytearray(512)
+    mv = memoryview(buf)
+    restante = _fin - _cabeza
+    with open(archivo, "rb") as src, open(tmp, "wb") as dst:
+        src.seek(_cabeza)
+        while restante > 0:
+            n = src.readinto(mv[:min(restante, len(buf))])
+            if not n:
+                break
+            dst.write(mv[:n])
+            restante -= n
+    os.remove(archivo)
+    os.rename(tmp, archivo)
+    _fin -= _cabeza
+    _cabeza = 0
+    _guardar_cabeza()
+
+def abrir():
+    """Recuperar la cola desde la flash al arrancar"""
+    global _cabeza, _fin, _n
+    _cabeza = _fin = _n = 0
+    try:
+        tam = os.stat(fw.COLA_ARCHIVO)[6]
+    except OSError:
+        _borrar()
+        return
+    try:
+        with open(fw.COLA_PUNTERO, "rb") as f:
+            _cabeza = struct.unpack("<I", f.read(4))[0]
+    except Exception:
+        _cabeza = 0
+    if _cabeza > tam:
+        print("⚠️  Puntero de cola inválido, se descarta la cola")
+        _borrar()
+        return
+
+    off = _cabeza
+    n = 0
+    with open(fw.COLA_ARCHIVO, "rb") as f:
+        f.seek(off)
+        while off + _HDR_LEN <= tam:
+            largo = struct.unpack(_HDR, f.read(_HDR_LEN))[1]
+            if off + _HDR_LEN + largo > tam:
+                break
+            f.seek(largo, 1)
+            off += _HDR_LEN + largo
+            n += 1
+    _fin = off
+    _n = n
+
+    if n == 0:
+        _borrar()
+        return
+    if off < tam:
+        # Un corte de energía dejó un registro a medias al final
+        print("⚠️  Registro incompleto al final de la cola, compactando")
+        _compactar()
+    print(f"📦 Cola en flash: {n} mensajes pendientes")
+
+def pendientes():
+    return _n
+
+def agregar(seq, payload):
+    """Guardar un mensaje no publicado al final de la cola"""
+    global _fin, _n
+    if isinstance(payload, str):
+        payload = payload.encode()
+    if _n >= fw.COLA_MAX_MSGS:
+        if fw.COLA_DESCARTE == "nuevos":
+            print(f"⚠️  Cola llena, se descarta #{seq}")
+            return False
+        print("⚠️  Cola llena, se descarta el mensaje más antiguo")
+        descartar_frente()
+    try:
+        with open(fw.COLA_ARCHIVO, "ab") as f:
+            f.write(struct.pack(_HDR, seq, len(payload)))
+            f.write(payload)
+    except OSError as e:
+        print(f"✗ No se pudo encolar #{seq}: {e}")
+        return False
+    _fin += _HDR_LEN + len(payload)
+    _n += 1
+    print(f"📦 #{seq} guardado en cola ({_n} pendientes)")
+    return True
+
+def frente():
+    """(seq, payload) del mensaje pendiente más antiguo, sin quitarlo"""
+    with open(fw.COLA_ARCHIVO, "rb") as f:
+        f.seek(_cabeza)
+        seq, largo = struct.unpack(_HDR, f.read(_HDR_LEN))
+        return seq, f.read(largo)
+
+def descartar_frente():
+    """Quitar el mensaje más antiguo (ya publicado o descartado)"""
+    global _cabeza, _n
+    with open(fw.COLA_ARCHIVO, "rb") as f:
+        f.seek(_cabeza)
+        largo = struct.unpack(_HDR, f.read(_HDR_LEN))[1]
+    _cabeza += _HDR_LEN + largo
+    _n -= 1
+    if _n == 0:
+        _borrar()
+    elif _cabeza >= fw.COLA_COMPACTAR_BYTES:
+        _compactar()
+    else:
+        _guardar_cabeza()
+
+async def drenar():
+    """Reenviar los pendientes sin esperar intervalo, del más antiguo al más nuevo.
+    Se detiene en el primer fallo. Retorna cuántos se publicaron"""
+    enviados = 0
+    while _n:
+        seq, payload = frente()
+        print(f"📦 Reenviando #{seq} ({_n} pendientes)")
+        if await fw.mqtt_publish(fw.TOPIC_PUB, payload) is None:
+            break
+        descartar_frente()
+        enviados += 1
+    if enviados:
+        print(f"✓ {enviados} mensajes de la cola publicados, quedan {_n}")
+    return enviados
@@ -0,0 +1,69 @@
+"""
+Payload compacto (PAYLOAD_FORMATO = "compacto" en main.py): binario con byte
+de versión, ~6x menos bytes que el JSON; se decodifica con
+host/decodificador.py. main.py lo importa solo con ese formato
+"""
+
+import time
+import struct
+
+fw = None   # Programa principal (main.py); lo asigna main.py al importar este módulo
+
+# Formato v2, little-endian:
+#   B versión | B tipo (0 lectura, 1 lote) | B largo id | id | I contador |
+#   b RSSI en dBm
+#   lectura: h temperatura*10 | H humedad*10 | I ppm*10
+#   lote:    B n | n x (H edad en décimas de s | h temp | H hum | I ppm)
+# Un valor None se codifica como -32768 (h), 65535 (H), 0xFFFFFFFF (I) o
+# -128 (RSSI). v1 no traía RSSI y su ppm (H) saturaba en 6553.4
+FORMATO_VERSION = 2
+TIPO_LECTURA = 0
+TIPO_LOTE = 1
+
+def _fijo(v, minimo, maximo, nulo):
+    """Décimas saturadas al rango del campo"""
+    if v == fw.NULO:
+        return nulo
+    return minimo if v < minimo else maximo if v > maximo else v
+
+def _campos(buf, pos, t, h, p):
+    struct.pack_into("<hHI", buf, pos,
+                     _fijo(t, -32767, 32767, -32768),
+                     _fijo(h, 0, 65534, 65535),
+                     _fijo(p, 0, 0xFFFFFFFE, 0xFFFFFFFF))
+    return pos + 8
+
+def _cabecera(buf, tipo):
+    uid = fw._UID
+    rssi = fw.senal_rssi
+    struct.pack_into("<BBB", buf, 0, FORMATO_VERSION, tipo, len(uid))
+    pos = fw._escribir(buf, 3, uid)
+    struct.pack_into("<Ib", buf, pos, fw.count, -128 if rssi is None else rssi)
+    return pos + 5
+
+def codificar_lectura(datos):
+    """Una lectura en formato compacto (22 bytes con el id de 6 bytes)"""
+    decimas = fw.decimas
+    buf = fw._buf_nuevo()
+    pos = _cabecera(buf, TIPO_LECTURA)
+    pos = _campos(buf, pos, decimas(datos["temperatura"]),
+                  decimas(datos["humedad"]), decimas(datos["ppm"]))
+    return fw._buf_listo(pos)
+
+def codificar_lote(ahora):
+    """El lote en formato compacto, de la lectura más antigua a la más reciente"""
+    buf = fw._buf_nuevo()
+    pos = _cabecera(buf, TIPO_LOTE)
+    lote_n = fw._lote_n
+    lote_inicio = fw._lote_inicio
+    lote_t = fw._lote_t
+    lote_v = fw._lote_v
+    tamano = fw.BATCH_SIZE
+    buf[pos] = lote_n
+    pos += 1
+    for k in range(lote_n):
+        i = (lote_inicio + k) % tamano
+        edad = time.ticks_diff(ahora, lote_t[i]) // 100
+        struct.pack_into("<H", buf, pos, edad if edad < 65535 else 65535)
+        pos = _campos(buf, pos + 2, lote_v[3 * i], lote_v[3 * i + 1], lote_v[3 * i + 2])
+    return fw._buf_listo(pos)
@@ -0,0 +1,553 @@
+"""
+Emulador del módem SIMCom A7670 (subconjunto AT/MQTT usado por el firmware)
+
+Se comporta como la UART del módem: el firmware escribe comandos con
+write() y lee respuestas con any()/read()/readinto(). Cada respuesta se
+entrega tras una latencia configurable, medida con reloj real.
+
+    emu = A7670(escala=0.1)             # todas las latencias 10x más cortas
+    emu.latencias["AT+CMQTTPUB"] = 800
+    emu.inyectar_fallo("AT+CMQTTCONNECT", 2)    # los 2 próximos dan ERROR
+    emu.cortar_enlace()                 # +CMQTTCONNLOST y publicaciones fallidas
+    emu.restaurar_enlace()
+"""
+
+import time
+
+# Latencias por defecto (ms) hasta la respuesta final de cada comando
+LATENCIAS = {
+    "arranque": 3000,       # PWRKEY -> RDY / PB DONE
+    "registro": 2000,       # encendido -> +CREG: 0,1
+    "AT": 20,
+    "AT+CGATT": 300,
+    "AT+CGACT": 500,
+    "AT+CPING": 400,
+    "AT+CCERTDOWN": 200,
+    "AT+CMQTTSTART": 150,
+    "AT+CMQTTSTOP": 100,
+    "AT+CMQTTACCQ": 50,
+    "AT+CMQTTCONNECT": 2500,
+    "AT+CMQTTDISC": 200,
+    "AT+CMQTTTOPIC": 30,
+    "AT+CMQTTPAYLOAD": 30,
+    "AT+CMQTTPUB": 250,
+}
+
+
+try:
+    _monotonic = time.monotonic
+except AttributeError:
+    # Puerto unix de MicroPython
+    def _monotonic():
+        return time.ticks_ms() / 1000
+
+
+# Velocidades que acepta AT+IPR
+BAUDIOS = (9600, 19200, 38400, 57600, 115200, 230400, 460800, 921600,
+           1000000, 1500000, 2000000, 3000000, 3200000, 3686400)
+
+
+def _ahora_ms():
+    return _monotonic() * 1000
+
+
+class A7670:
+    def __init__(self, latencias=None, escala=1.0, eco=True, encendido=False):
+        self.latencias = dict(LATENCIAS)
+        if latencias:
+            self.latencias.update(latencias)
+        self.escala = escala
+        self.eco = eco
+        # Errores inyectados: prefijo de comando -> veces que debe fallar
+        self.fallos = {}
+        # Velocidad de la UART del lado del ESP32 (la fija machine.UART)
+        self.baud_esp32 = 115200
+        self._salida = []          # [(vence_ms, bytes, baudios)]
+        self._rx_hasta = 0         # Fin de la recepción en curso (ms)
+        self._linea = bytearray()
+        self._crudo = None         # (bytes pendientes, callback)
+        self._crudo_buf = bytearray()
+        self._saltar_lf = False
+        self.bytes_rx = 0          # bytes recibidos desde el ESP32
+        self.bytes_tx = 0          # bytes enviados al ESP32
+        self.comandos = []         # [(ms, comando)]
+        self.publicados = []       # [(topic, payload)]
+        self.certs = {}
+        self.ssl = {}
+        self.enlace_caido = False
+        # PSM pedido con AT+CPSMS y tiempo activo (T3324) en s antes de entrar
+        self.psm = False
+        self.psm_activo_s = None
+        self.creg_n = 0
+        # Calidad de señal que reporta AT+CSQ (0-31, 99 = desconocida)
+        self.csq = 20
+        # Algunas versiones de firmware borran el tópico tras CMQTTPUB
+        self.borrar_topic = False
+        # Publicaciones que se rechazan con "cliente ocupado" (+CMQTTPUB: 0,14)
+        self.pub_ocupado = 0
+        self._reset_estado()
+        if encendido:
+            self.encendido = True
+            self._t_encendido = _ahora_ms() - 60000
+
+    # ─── Estado ───
+    def _reset_estado(self):
+        # AT+IPR / AT+IFC no sobreviven a un apagado
+        self.baudrate = 115200
+        self.flujo = False
+        self.encendido = False
+        self._t_encendido = 0
+        self.pdp = False
+        self.gatt = False
+        self.mqtt_iniciado = False
+        self.cliente = None
+        self.conectado = False
+        self.topic = None
+        self.payload = None
+        # AT+CSCLK=1: duerme con DTR en alto. En PSM no despierta con DTR
+        self.csclk = 0
+        self.dormido = False
+        self.en_psm = False
+        self._t_dormido = 0
+
+    def _lat(self, clave, defecto=20):
+        return self.latencias.get(clave, defecto) * self.escala
+
+    def pulso_pwrkey(self):
+        """Un pulso en PWRKEY alterna encendido/apagado (o saca de PSM)"""
+        if self.en_psm:
+            self.en_psm = self.dormido = False
+            return
+        if self.encendido:
+            self._reset_estado()
+            self._salida = []
+            return
+        self.encendido = True
+        self._t_encendido = _ahora_ms()
+        boot = self._lat("arranque")
+        self._emitir(b"\r\nRDY\r\n", boot)
+        self._emitir(b"\r\n+CPIN: READY\r\n", boot + 50)
+        self._emitir(b"\r\nSMS DONE\r\n", boot + 100)
+        self._emitir(b"\r\nPB DONE\r\n", boot + 150)
+
+    def apagar(self):
+        self._reset_estado()
+        self._salida = []
+
+    def dtr(self, v):
+        """DTR en alto duerme al módem si AT+CSCLK=1; en bajo lo despierta,
+        salvo que haya pasado T3324 y esté en PSM (entonces solo con PWRKEY).
+        En PSM la sesión con el broker se pierde; en sleep la mantiene el módem"""
+        if v:
+            if self.encendido and self.csclk == 1 and not self.dormido:
+                self.dormido = True
+                self._t_dormido = _ahora_ms()
+            return
+        if not self.dormido or self.en_psm:
+            return
+        if self.psm and self.psm_activo_s is not None and (
+                _ahora_ms() - self._t_dormido >= self.psm_activo_s * 1000 * self.escala):
+            self.en_psm = True
+            self.conectado = False
+            return
+        self.dormido = False
+
+    def listo(self):
+        return self.encendido and _ahora_ms() - self._t_encendido >= self._lat("arranque")
+
+    def registrado(self):
+        return self.listo() and _ahora_ms() - self._t_encendido >= (
+            self._lat("arranque") + self._lat("registro"))
+
+    def cortar_enlace(self):
+        """Modo enlace caído: el broker cae y las publicaciones fallan"""
+        self.enlace_caido = True
+        if self.conectado:
+            self.conectado = False
+            self._emitir(b"\r\n+CMQTTCONNLOST: 0,1\r\n", 0)
+
+    def recibir(self, topic, payload):
+        """Entregar un mensaje MQTT entrante con la secuencia de URC +CMQTTRX*"""
+        self._emitir(b"\r\n+CMQTTRXSTART: 0,%d,%d\r\n" % (len(topic), len(payload)), 0)
+        self._emitir(b"+CMQTTRXTOPIC: 0,%d\r\n%s\r\n" % (len(topic), topic), 0)
+        self._emitir(b"+CMQTTRXPAYLOAD: 0,%d\r\n%s\r\n" % (len(payload), payload), 0)
+        self._emitir(b"+CMQTTRXEND: 0\r\n", 0)
+
+    def perder_registro(self):
+        if self.creg_n:
+            self._emitir(b"\r\n+CREG: 2\r\n", 0)
+
+    def restaurar_enlace(self):
+        self.enlace_caido = False
+
+    def inyectar_fallo(self, prefijo, veces=1):
+        self.fallos[prefijo] = self.fallos.get(prefijo, 0) + veces
+
+    def _falla(self, cmd):
+        for prefijo, n in self.fallos.items():
+            if n > 0 and cmd.startswith(prefijo):
+                self.fallos[prefijo] = n - 1
+                return True
+        return False
+
+    # ─── Interfaz tipo UART ───
+    def _tiempo_linea(self, n):
+        """ms que tardan n bytes por la línea serie (8N1: 10 bits por byte)"""
+        return n * 10000.0 / self.baudrate
+
+    def _emitir(self, data, retardo_ms):
+        # La respuesta empieza cuando terminó de llegar el comando
+        vence = max(_ahora_ms(), self._rx_hasta) + retardo_ms + self._tiempo_linea(len(data))
+        # Mantener orden FIFO aunque la latencia sea menor
+        if self._salida and self._salida[-1][0] > vence:
+            vence = self._salida[-1][0]
+        self._salida.append((vence, data, self.baudrate))
+
+    def _disponibles(self):
+        ahora = _ahora_ms()
+        total = 0
+        for vence, data, _ in self._salida:
+            if vence > ahora:
+                break
+            total += len(data)
+        return total
+
+    def any(self):
+        return self._disponibles()
+
+    def read(self, n=None):
+        disp = self._disponibles()
+        if not disp:
+            return None
+        if n is None or n > disp:
+            n = disp
+        out = bytearray()
+        leidos = 0
+        while leidos < n:
+            vence, data, baud = self._salida[0]
+            falta = n - leidos
+            if len(data) > falta:
+                self._salida[0] = (vence, data[falta:], baud)
+                data = data[:falta]
+            else:
+                self._salida.pop(0)
+            leidos += len(data)
+            # Con otra velocidad del lado del ESP32 solo llega basura
+            if baud == self.baud_esp32:
+                out += data
+        self.bytes_tx += leidos
+        return bytes(out) or None
+
+    def readinto(self, buf, n=None):
+        if n is None:
+            n = len(buf)
+        data = self.read(n)
+        if not data:
+            return None
+        buf[:len(data)] = data
+        return len(data)
+
+    def write(self, data):
+        if isinstance(data, str):
+            data = data.encode()
+        data = bytes(data)
+        self.bytes_rx += len(data)
+        self._rx_hasta = max(_ahora_ms(), self._rx_hasta) + self._tiempo_linea(len(data))
+        if not self.encendido or not self.listo() or self.dormido:
+            return len(data)
+        if self.baud_esp32 != self.baudrate:
+            return len(data)
+        for i, b in enumerate(data):
+            if self._saltar_lf:
+                self._saltar_lf = False
+                if b == 0x0A:
+                    continue
+            if self._crudo is not None:
+                self._crudo_buf.append(b)
+                if len(self._crudo_buf) >= self._crudo[0]:
+                    cb = self._crudo[1]
+                    contenido = bytes(self._crudo_buf)
+                    self._crudo = None
+                    self._crudo_buf = bytearray()
+                    cb(contenido)
+                continue
+            if b == 0x0D:
+                linea = self._linea.decode("utf-8", "ignore").strip()
+                self._linea = bytearray()
+                if linea:
+                    self._comando(linea)
+                # El LF del "\r\n" no forma parte de los datos del prompt
+                self._saltar_lf = True
+            elif b != 0x0A:
+                self._linea.append(b)
+        return len(data)
+
+    # ─── Intérprete de comandos ───
+    def _ok(self, extra=b"", retardo=None, clave="AT"):
+        if retardo is None:
+            retardo = self._lat(clave)
+        self._emitir(extra + b"\r\nOK\r\n", retardo)
+
+    def _error(self, retardo=None):
+        self._emitir(b"\r\nERROR\r\n", self._lat("AT") if retardo is None else retardo)
+
+    def _prompt(self, n, cb, clave):
+        self._emitir(b"\r\n>", self._lat(clave))
+        self._crudo = (n, cb)
+
+    def _comando(self, cmd):
+        self.comandos.append((_ahora_ms(), cmd))
+        if self.eco:
+            self._emitir(cmd.encode() + b"\r", 0)
+        if self._falla(cmd):
+            self._error()
+            return
+        u = cmd.upper()
+        base = u.split("=")[0].split("?")[0]
+        arg = cmd.split("=", 1)[1] if "=" in cmd else ""
+        h = getattr(self, "_cmd_" + base[3:].replace("+", "").replace("&", ""), None) if base.startswith("AT+") else None
+        if u == "AT":
+            self._ok()
+        elif u in ("ATE0", "ATE1"):
+            self.eco = u == "ATE1"
+            self._ok()
+        elif h is not None:
+            h(u, arg)
+        else:
+            self._error()
+
+    def _cmd_CSQ(self, u, arg):
+        self._ok(b"\r\n+CSQ: %d,99\r\n" % self.csq)
+
+    def _cmd_CPSI(self, u, arg):
+        if self.csq == 99:
+            self._ok(b"\r\n+CPSI: NO SERVICE,Online\r\n")
+            return
+        # RSRP ~20 dB por debajo del RSSI, en décimas como el módem
+        rssi = -113 + 2 * self.csq
+        self._ok(b"\r\n+CPSI: LTE,Online,732-103,0x1234,12345678,256,EUTRAN-BAND4,2175,5,5,-90,%d,%d,15\r\n"
+                 % ((rssi - 20) * 10, rssi * 10))
+
+    def _cmd_CREG(self, u, arg):
+        if u.endswith("?"):
+            stat = 1 if self.registrado() else 2
+            self._ok(b"\r\n+CREG: %d,%d\r\n" % (self.creg_n, stat))
+        else:
+            self.creg_n = int(arg or 0)
+            self._ok()
+
+    def _cmd_CEREG(self, u, arg):
+        if u.endswith("?"):
+            stat = 1 if self.registrado() else 2
+            self._ok(b"\r\n+CEREG: 0,%d\r\n" % stat)
+        else:
+            self._ok()
+
+    def _cmd_CGDCONT(self, u, arg):
+        self._ok()
+
+    def _cmd_CGATT(self, u, arg):
+        if u.endswith("?"):
+            self._ok(b"\r\n+CGATT: %d\r\n" % int(self.gatt))
+            return
+        self.gatt = arg.strip() == "1"
+        self._ok(clave="AT+CGATT")
+
+    def _cmd_CGACT(self, u, arg):
+        if u.endswith("?"):
+            self._ok(b"\r\n+CGACT: 1,%d\r\n" % int(self.pdp))
+            return
+        if not self.registrado():
+            self._error()
+            return
+        self.pdp = arg.startswith("1")
+        self.gatt = self.gatt or self.pdp
+        self._ok(clave="AT+CGACT")
+
+    def _cmd_CPING(self, u, arg):
+        lat = self._lat("AT+CPING")
+        self._ok()
+        if self.pdp and not self.enlace_caido:
+            self._emitir(b"\r\n+CPING: 1,8.8.8.8,64,45,255\r\n", lat)
+            self._emitir(b"\r\n+CPING: 3,1,1,0,45,45,45\r\n", 10)
+        else:
+            self._emitir(b"\r\n+CPING: 2\r\n", lat)
+            self._emitir(b"\r\n+CPING: 3,1,0,1,0,0,0\r\n", 10)
+
+    def _cmd_CCERTLIST(self, u, arg):
+        lineas = b"".join(b'\r\n+CCERTLIST: "%s"' % n.encode() for n in sorted(self.certs))
+        self._ok(lineas + (b"\r\n" if lineas else b""))
+
+    def _cmd_CCERTDOWN(self, u, arg):
+        nombre, n = arg.rsplit(",", 1)
+        nombre = nombre.strip('"')
+
+        def fin(data):
+            self.certs[nombre] = data
+            self._ok(clave="AT+CCERTDOWN")
+        self._prompt(int(n), fin, "AT")
+
+    def _cmd_CCERTDELE(self, u, arg):
+        self.certs.pop(arg.strip('"'), None)
+        self._ok()
+
+    def _cmd_CSSLCFG(self, u, arg):
+        self.ssl[arg.split(",")[0]] = arg
+        self._ok()
+
+    def _cmd_CMQTTSTART(self, u, arg):
+        lat = self._lat("AT+CMQTTSTART")
+        if self.mqtt_iniciado:
+            self._ok()
+            self._emitir(b"\r\n+CMQTTSTART: 23\r\n", lat)
+            return
+        if not self.pdp:
+            self._ok()
+            self._emitir(b"\r\n+CMQTTSTART: 1\r\n", lat)
+            return
+        self.mqtt_iniciado = True
+        self._ok()
+        self._emitir(b"\r\n+CMQTTSTART: 0\r\n", lat)
+
+    def _cmd_CMQTTSTOP(self, u, arg):
+        if not self.mqtt_iniciado:
+            self._error()
+            return
+        self.mqtt_iniciado = False
+        self.cliente = None
+        self.conectado = False
+        self._ok()
+        self._emitir(b"\r\n+CMQTTSTOP: 0\r\n", self._lat("AT+CMQTTSTOP"))
+
+    def _cmd_CMQTTACCQ(self, u, arg):
+        if u.endswith("?"):
+            if not self.mqtt_iniciado:
+                self._error()
+                return
+            if self.cliente:
+                self._ok(b'\r\n+CMQTTACCQ: 0,"%s",1\r\n' % self.cliente.encode())
+            else:
+                self._ok(b'\r\n+CMQTTACCQ: 0,""\r\n')
+            return
+        if not self.mqtt_iniciado or self.cliente:
+            self._error()
+            return
+        self.cliente = arg.split(",")[1].strip('"')
+        self._ok(clave="AT+CMQTTACCQ")
+
+    def _cmd_CMQTTREL(self, u, arg):
+        if not self.cliente or self.conectado:
+            self._error()
+            return
+        self.cliente = None
+        self._ok()
+
+    def _cmd_CMQTTSSLCFG(self, u, arg):
+        self._ok()
+
+    def _cmd_CMQTTCONNECT(self, u, arg):
+        if not self.cliente or self.conectado:
+            self._error()
+            return
+        self._ok()
+        lat = self._lat("AT+CMQTTCONNECT")
+        if self.enlace_caido or not self.pdp:
+            self._emitir(b"\r\n+CMQTTCONNECT: 0,32\r\n", lat)
+            return
+        self.conectado = True
+        self._emitir(b"\r\n+CMQTTCONNECT: 0,0\r\n", lat)
+
+    def _cmd_CMQTTDISC(self, u, arg):
+        if u.endswith("?"):
+            self._ok(b"\r\n+CMQTTDISC: 0,%d\r\n" % (0 if self.conectado else 1))
+            return
+        if not self.conectado:
+            self._error()
+            return
+        self.conectado = False
+        self._ok()
+        self._emitir(b"\r\n+CMQTTDISC: 0,0\r\n", self._lat("AT+CMQTTDISC"))
+
+    def _cmd_CMQTTTOPIC(self, u, arg):
+        if not self.cliente:
+            self._error()
+            return
+        n = int(arg.split(",")[1])
+
+        def fin(data):
+            self.topic = data
+            self._ok(clave="AT+CMQTTTOPIC")
+        self._prompt(n, fin, "AT+CMQTTTOPIC")
+
+    def _cmd_CMQTTPAYLOAD(self, u, arg):
+        if not self.cliente:
+            self._error()
+            return
+        n = int(arg.split(",")[1])
+
+        def fin(data):
+            self.payload = data
+            self._ok(clave="AT+CMQTTPAYLOAD")
+        self._prompt(n, fin, "AT+CMQTTPAYLOAD")
+
+    def _cmd_CMQTTPUB(self, u, arg):
+        lat = self._lat("AT+CMQTTPUB")
+        if not self.cliente:
+            self._error()
+            return
+        if not self.conectado or self.enlace_caido:
+            self._ok()
+            self._emitir(b"\r\n+CMQTTPUB: 0,11\r\n", lat)
+            return
+        if self.pub_ocupado:
+            self.pub_ocupado -= 1
+            self.payload = None
+            self._ok()
+            self._emitir(b"\r\n+CMQTTPUB: 0,14\r\n", lat)
+            return
+        if self.topic is None or self.payload is None:
+            self._ok()
+            self._emitir(b"\r\n+CMQTTPUB: 0,18\r\n", lat)
+            return
+        self.publicados.append((self.topic.decode(), self.payload))
+        self.payload = None
+        if self.borrar_topic:
+            self.topic = None
+        self._ok()
+        self._emitir(b"\r\n+CMQTTPUB: 0,0\r\n", lat)
+
+    def _cmd_IPR(self, u, arg):
+        if u.endswith("?"):
+            self._ok(b"\r\n+IPR: %d\r\n" % self.baudrate)
+            return
+        if int(arg) not in BAUDIOS:
+            self._error()
+            return
+        # El OK sale a la velocidad anterior; lo siguiente ya a la nueva
+        self._ok()
+        self.baudrate = int(arg)
+
+    def _cmd_IFC(self, u, arg):
+        if u.endswith("?"):
+            self._ok(b"\r\n+IFC: %d,%d\r\n" % ((2, 2) if self.flujo else (0, 0)))
+            return
+        self.flujo = arg.replace(" ", "") == "2,2"
+        self._ok()
+
+    def _cmd_CPSMS(self, u, arg):
+        campos = [c.strip().strip('"') for c in arg.split(",")]
+        self.psm = campos[0] == "1"
+        self.psm_activo_s = None
+        if self.psm and len(campos) > 4 and len(campos[4]) == 8:
+            # T3324: 3 bits de unidad (2 s, 1 min, 6 min) y 5 de valor
+            unidad = {0: 2, 1: 60, 2: 360}.get(int(campos[4][:3], 2))
+            if unidad:
+                self.psm_activo_s = unidad * int(campos[4][3:], 2)
+        self._ok()
+
+    def _cmd_CEDRXS(self, u, arg):
+        self._ok()
+
+    def _cmd_CSCLK(self, u, arg):
+        self.csclk = int(arg or 0)
+        self._ok()
@@ -0,0 +1,171 @@
+"""
+Benchmark de arranque y publicación de main.py contra el emulador A7670
+
+Mide cuánto tarda cada etapa de conectar() (power_on_modem ... mqtt_connect),
+la distribución de latencias de mqtt_publish (p50/p95/max) y los bytes por
+la UART, y los escribe como JSON para comparar antes/después de un cambio:
+
+    python benchmark.py                         # arranque en frío, 20 publicaciones
+    python benchmark.py --escenario caliente    # módem ya conectado (soft reset)
+    python benchmark.py --escenario ambos --salida antes.json
+
+Con --escala 1.0 (por defecto) las latencias del emulador son las de
+LATENCIAS en a7670_emulator.py y los tiempos son de reloj real.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import subprocess
+import sys
+import time
+
+AQUI = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, AQUI)
+
+import run_firmware as arnes  # noqa: E402
+from a7670_emulator import A7670  # noqa: E402
+
+ESCENARIOS = ("frio", "caliente")
+ORDEN_ETAPAS = (
+    "power_on_modem", "uart_acelerar", "wait_for_network", "setup_gprs", "load_certificates",
+    "configure_ssl", "mqtt_start", "mqtt_acquire_client", "mqtt_connect",
+)
+
+
+def percentil(valores, p):
+    """Percentil por rango más cercano (valores ya ordenados)"""
+    if not valores:
+        return None
+    k = max(0, min(len(valores) - 1, -(-p * len(valores) // 100) - 1))
+    return valores[k]
+
+
+def distribucion(valores):
+    v = sorted(valores)
+    return {
+        "n": len(v),
+        "p50": percentil(v, 50),
+        "p95": percentil(v, 95),
+        "max": v[-1] if v else None,
+        "media": round(sum(v) / len(v), 1) if v else None,
+    }
+
+
+def correr(escenario, publicaciones, escala, intervalo_ms, firmware_dir=None, verbose=False):
+    """Ejecuta un escenario en este proceso y retorna el resultado como dict"""
+    emu = A7670(escala=escala, encendido=escenario == "caliente")
+    if escenario == "caliente":
+        emu.eco = False
+        emu.pdp = emu.gatt = emu.mqtt_iniciado = emu.conectado = True
+        emu.cliente = "ESP32_SENSORES_38182bf824ac"
+
+    latencias = []
+    bytes_msg = []
+    fin = lambda: len(latencias) >= publicaciones
+    arnes.instalar_time(fin)
+    arnes.preparar(emu, firmware_dir)
+    os.chdir(arnes.preparar_flash(firmware_dir=firmware_dir))
+
+    # stdout queda para el JSON
+    salida = contextlib.redirect_stdout(sys.stderr if verbose else io.StringIO())
+    t0 = time.monotonic()
+    with salida:
+        import main as firmware
+        firmware.PUBLISH_INTERVAL = intervalo_ms
+        firmware.SAMPLE_INTERVAL = intervalo_ms
+
+        publicar = firmware.mqtt_publish
+        conectado_ms = []
+        etapas = {}
+
+        async def mqtt_publish(topic, message):
+            if not conectado_ms:
+                conectado_ms.append(int((time.monotonic() - t0) * 1000))
+                etapas.update(firmware.tiempos_etapas)
+            rx0 = emu.bytes_rx
+            latencia = await publicar(topic, message)
+            if latencia is not None and topic == firmware.TOPIC_PUB:
+                latencias.append(latencia)
+                bytes_msg.append(emu.bytes_rx - rx0)
+            return latencia
+
+        firmware.mqtt_publish = mqtt_publish
+        try:
+            asyncio.run(arnes.supervisar(firmware.main_async(), fin))
+        except arnes.Detener:
+            pass
+
+    return {
+        "escenario": escenario,
+        "escala": escala,
+        "arranque_a_conectado_ms": conectado_ms[0] if conectado_ms else None,
+        "etapas_ms": {e: etapas[e] for e in ORDEN_ETAPAS if e in etapas},
+        "publicacion_ms": distribucion(latencias),
+        "uart": {
+            "bytes_enviados": emu.bytes_rx,
+            "bytes_recibidos": emu.bytes_tx,
+            "comandos_at": len(emu.comandos),
+            "bytes_por_publicacion": distribucion(bytes_msg),
+        },
+    }
+
+
+def correr_aparte(escenario, args):
+    """Cada escenario en su propio proceso: el firmware guarda estado global.
+    El resumen del hijo sale por stderr; su JSON se lee de stdout"""
+    cmd = [sys.executable, os.path.abspath(__file__), "--escenario", escenario,
+           "--publicaciones", str(args.publicaciones), "--escala", str(args.escala),
+           "--intervalo", str(args.intervalo)]
+    if args.firmware:
+        cmd += ["--firmware", args.firmware]
+    r = subprocess.run(cmd, stdout=subprocess.PIPE, check=True)
+    return json.loads(r.stdout)[0]
+
+
+def resumen(r):
+    print(f"\n[{r['escenario']}] conectado en {r['arranque_a_conectado_ms']} ms", file=sys.stderr)
+    for etapa, ms in r["etapas_ms"].items():
+        print(f"  {etapa:<20} {ms:>7} ms", file=sys.stderr)
+    p = r["publicacion_ms"]
+    print(f"  mqtt_publish         p50 {p['p50']} ms, p95 {p['p95']} ms, max {p['max']} ms (n={p['n']})",
+          file=sys.stderr)
+    u = r["uart"]
+    print(f"  UART                 {u['bytes_enviados']} B enviados, {u['bytes_recibidos']} B recibidos, "
+          f"{u['comandos_at']} comandos", file=sys.stderr)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--escenario", choices=ESCENARIOS + ("ambos",), default="frio")
+    ap.add_argument("--publicaciones", type=int, default=20)
+    ap.add_argument("--escala", type=float, default=1.0)
+    ap.add_argument("--intervalo", type=int, default=1000,
+                    help="PUBLISH_INTERVAL durante la medición (ms)")
+    ap.add_argument("--firmware", default=None, help="directorio con main.py (por defecto Esp32/)")
+    ap.add_argument("--salida", default=None, help="archivo JSON (por defecto stdout)")
+    ap.add_argument("--verbose", action="store_true", help="mostrar la salida del firmware")
+    args = ap.parse_args()
+
+    salida = os.path.abspath(args.salida) if args.salida else None
+    if args.escenario == "ambos":
+        resultados = [correr_aparte(e, args) for e in ESCENARIOS]
+    else:
+        firmware_dir = os.path.abspath(args.firmware) if args.firmware else None
+        resultados = [correr(args.escenario, args.publicaciones, args.escala,
+                             args.intervalo, firmware_dir, args.verbose)]
+        resumen(resultados[0])
+
+    texto = json.dumps(resultados, indent=2)
+    if salida:
+        with open(salida, "w") as f:
+            f.write(texto + "\n")
+    else:
+        print(texto)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Decodificador del payload compacto del ESP32 (PAYLOAD_FORMATO = "compacto")
+
+Convierte el binario publicado por el dispositivo al mismo JSON que publica
+en modo "json" (ver redme.md), para que el backend y el dashboard no cambien.
+Python puro, sin dependencias.
+
+    from decodificador import decodificar
+    datos = decodificar(payload)        # bytes -> dict
+
+    python decodificador.py 0200063818...   # hex -> JSON por stdout
+"""
+
+import json
+import struct
+import sys
+
+PREFIJO_ID = "ESP32_SENSORES_"
+
+TIPO_LECTURA = 0
+TIPO_LOTE = 1
+
+_NULO_H = -32768
+_NULO_HH = 65535
+_NULO_I = 0xFFFFFFFF
+_NULO_RSSI = -128
+
+
+class FormatoInvalido(ValueError):
+    pass
+
+
+def _decimas(v, nulo):
+    return None if v == nulo else round(v / 10.0, 1)
+
+
+def _campos_v1(buf, off):
+    t, h, p = struct.unpack_from("<hHH", buf, off)
+    return {
+        "temperatura": _decimas(t, _NULO_H),
+        "humedad": _decimas(h, _NULO_HH),
+        "ppm": _decimas(p, _NULO_HH),
+    }, off + 6
+
+
+def _campos_v2(buf, off):
+    # v2: ppm en 32 bits, v1 saturaba en 6553.4
+    t, h, p = struct.unpack_from("<hHI", buf, off)
+    return {
+        "temperatura": _decimas(t, _NULO_H),
+        "humedad": _decimas(h, _NULO_HH),
+        "ppm": _decimas(p, _NULO_I),
+    }, off + 8
+
+
+def _decodificar(buf, campos, con_rssi):
+    tipo, largo_id = struct.unpack_from("<BB", buf, 1)
+    off = 3
+    uid = buf[off:off + largo_id]
+    off += largo_id
+    contador, = struct.unpack_from("<I", buf, off)
+    off += 4
+    datos = {"device_id": PREFIJO_ID + uid.hex(), "contador": contador}
+    rssi = None
+    if con_rssi:
+        rssi, = struct.unpack_from("<b", buf, off)
+        off += 1
+        if rssi == _NULO_RSSI:
+            rssi = None
+
+    # Mismo orden de claves que el JSON del dispositivo
+    if tipo == TIPO_LECTURA:
+        lectura, off = campos(buf, off)
+        datos.update(lectura)
+        if con_rssi:
+            datos["rssi"] = rssi
+    elif tipo == TIPO_LOTE:
+        if con_rssi:
+            datos["rssi"] = rssi
+        n, = struct.unpack_from("<B", buf, off)
+        off += 1
+        lecturas = []
+        for _ in range(n):
+            edad, = struct.unpack_from("<H", buf, off)
+            lectura, off = campos(buf, off + 2)
+            lectura["edad_ms"] = edad * 100
+            lecturas.append(lectura)
+        datos["lecturas"] = lecturas
+    else:
+        raise FormatoInvalido(f"tipo desconocido: {tipo}")
+
+    if off != len(buf):
+        raise FormatoInvalido(f"sobran {len(buf) - off} bytes")
+    return datos
+
+
+def _decodificar_v1(buf):
+    return _decodificar(buf, _campos_v1, False)
+
+
+def _decodificar_v2(buf):
+    return _decodificar(buf, _campos_v2, True)
+
+
+_VERSIONES = {
+    1: _decodificar_v1,
+    2: _decodificar_v2,
+}
+
+
+def decodificar(payload):
+    """Payload del dispositivo (compacto o JSON) -> dict con la forma JSON"""
+    buf = bytes(payload)
+    if buf[:1] == b"{":
+        return json.loads(buf)
+    if not buf:
+        raise FormatoInvalido("payload vacío")
+    version = buf[0]
+    if version not in _VERSIONES:
+        raise FormatoInvalido(f"versión no soportada: {version}")
+    try:
+        return _VERSIONES[version](buf)
+    except struct.error as e:
+        raise FormatoInvalido(f"payload truncado: {e}")
+
+
+def main():
+    if len(sys.argv) > 1:
+        payload = bytes.fromhex(sys.argv[1])
+    else:
+        payload = sys.stdin.buffer.read()
+    print(json.dumps(decodificar(payload), indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+"""Módulo dht simulado"""
+
+import time
+
+temperatura = 24.5
+humedad = 61.0
+# Probabilidad de fallo de lectura (0..1)
+fallo = 0.0
+
+
+class DHT22:
+    def __init__(self, pin):
+        self._t = None
+        self._h = None
+        self._ultima = None
+
+    def measure(self):
+        import random
+        ahora = time.ticks_ms() / 1000
+        if self._ultima is not None and ahora - self._ultima < 2.0:
+            self._ultima = ahora
+            raise OSError(116)  # ETIMEDOUT: lectura antes de 2 s
+        self._ultima = ahora
+        if random.random() < fallo:
+            raise OSError(116)
+        self._t = temperatura
+        self._h = humedad
+
+    def temperature(self):
+        return self._t
+
+    def humidity(self):
+        return self._h
@@ -0,0 +1,64 @@
+"""FrameBuffer MONO_VLSB mínimo para el driver SSD1306"""
+
+MONO_VLSB = 0
+
+
+class FrameBuffer:
+    def __init__(self, buf, width, height, fmt, stride=None):
+        self._buf = buf
+        self._w = width
+        self._h = height
+
+    def pixel(self, x, y, c=None):
+        if not (0 <= x < self._w and 0 <= y < self._h):
+            return None if c is None else None
+        i = (y // 8) * self._w + x
+        bit = 1 << (y & 7)
+        if c is None:
+            return 1 if self._buf[i] & bit else 0
+        if c:
+            self._buf[i] |= bit
+        else:
+            self._buf[i] &= ~bit & 0xFF
+
+    def fill(self, c):
+        v = 0xFF if c else 0
+        for i in range(len(self._buf)):
+            self._buf[i] = v
+
+    def fill_rect(self, x, y, w, h, c):
+        for yy in range(max(0, y), min(self._h, y + h)):
+            for xx in range(max(0, x), min(self._w, x + w)):
+                self.pixel(xx, yy, c)
+
+    def hline(self, x, y, w, c):
+        self.fill_rect(x, y, w, 1, c)
+
+    def vline(self, x, y, h, c):
+        self.fill_rect(x, y, 1, h, c)
+
+    def rect(self, x, y, w, h, c, f=False):
+        if f:
+            self.fill_rect(x, y, w, h, c)
+        else:
+            self.hline(x, y, w, c)
+            self.hline(x, y + h - 1, w, c)
+            self.vline(x, y, h, c)
+            self.vline(x + w - 1, y, h, c)
+
+    def line(self, x1, y1, x2, y2, c):
+        n = max(abs(x2 - x1), abs(y2 - y1), 1)
+        for i in range(n + 1):
+            self.pixel(x1 + (x2 - x1) * i // n, y1 + (y2 - y1) * i // n, c)
+
+    def text(self, s, x, y, c=1):
+        # Sin fuente real: un patrón por carácter basta para la simulación
+        for i, ch in enumerate(s):
+            if ch != " ":
+                self.fill_rect(x + i * 8 + 1, y + 1, 6, 6, c)
+
+    def scroll(self, dx, dy):
+        pass
+
+    def blit(self, fb, x, y, key=-1, palette=None):
+        pass
@@ -0,0 +1,190 @@
+"""Módulo machine simulado para ejecutar el firmware en CPython"""
+
+import time
+
+# Emulador conectado a UART(1); lo asigna el arnés
+modem = None
+# Hooks de pines: número -> callable(valor)
+pin_hooks = {}
+# Valores ADC simulados (µV en read_uv, crudo en read)
+adc_uv = 800000
+
+_rtc_mem = bytearray()
+_reset_cause = 1
+
+PWRON_RESET = 1
+HARD_RESET = 2
+WDT_RESET = 3
+DEEPSLEEP_RESET = 4
+SOFT_RESET = 5
+
+
+class DeepSleep(Exception):
+    """Se lanza en lugar de dormir para que el arnés pueda reanudar"""
+
+    def __init__(self, ms):
+        super().__init__(ms)
+        self.ms = ms
+
+
+def unique_id():
+    return b"\x38\x18\x2b\xf8\x24\xac"
+
+
+def reset_cause():
+    return _reset_cause
+
+
+def deepsleep(ms=0):
+    raise DeepSleep(ms)
+
+
+def lightsleep(ms=0):
+    time.sleep(ms / 1000)
+
+
+def reset():
+    raise SystemExit("reset")
+
+
+def freq(*a):
+    return 240000000
+
+
+class Pin:
+    IN = 1
+    OUT = 3
+    PULL_UP = 2
+    PULL_DOWN = 1
+
+    def __init__(self, num, mode=-1, pull=-1, value=None, hold=None):
+        self.num = num
+        self._v = 0
+        if value is not None:
+            self.value(value)
+
+    def init(self, mode=-1, pull=-1, value=None, hold=None):
+        if value is not None:
+            self.value(value)
+
+    def value(self, v=None):
+        if v is None:
+            return self._v
+        self._v = int(bool(v))
+        h = pin_hooks.get(self.num)
+        if h:
+            h(self._v)
+
+    def __call__(self, v=None):
+        return self.value(v)
+
+    def on(self):
+        self.value(1)
+
+    def off(self):
+        self.value(0)
+
+
+class UART:
+    RTS = 1
+    CTS = 2
+
+    def __init__(self, id, baudrate=115200, **kw):
+        self.id = id
+        self.init(baudrate, **kw)
+
+    def init(self, baudrate=115200, **kw):
+        self.baudrate = baudrate
+        self.flow = kw.get("flow", 0)
+        if modem:
+            modem.baud_esp32 = baudrate
+
+    def any(self):
+        return modem.any() if modem else 0
+
+    def read(self, n=None):
+        return modem.read(n) if modem else None
+
+    def readinto(self, buf, n=None):
+        return modem.readinto(buf, n) if modem else None
+
+    def write(self, data):
+        if modem:
+            modem.write(data)
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def txdone(self):
+        return True
+
+
+class ADC:
+    ATTN_11DB = 3
+    WIDTH_12BIT = 3
+
+    def __init__(self, pin, atten=None):
+        self.pin = pin
+
+    def atten(self, a):
+        pass
+
+    def width(self, w):
+        pass
+
+    def read(self):
+        return min(4095, adc_uv * 4095 // 3100000)
+
+    def read_u16(self):
+        return min(65535, adc_uv * 65535 // 3100000)
+
+    def read_uv(self):
+        return adc_uv
+
+
+class I2C:
+    def __init__(self, id, scl=None, sda=None, freq=400000):
+        self.transacciones = 0
+        self.bytes = 0
+
+    def writeto(self, addr, buf, stop=True):
+        self.transacciones += 1
+        self.bytes += len(buf)
+        return 1
+
+    def writevto(self, addr, bufs, stop=True):
+        self.transacciones += 1
+        self.bytes += sum(len(b) for b in bufs)
+        return 1
+
+    def scan(self):
+        return [0x3C]
+
+
+class SPI:
+    def __init__(self, id, baudrate=1000000, **kw):
+        self.inits = 0
+        self.bytes = 0
+
+    def init(self, baudrate=1000000, **kw):
+        self.inits += 1
+
+    def write(self, buf):
+        self.bytes += len(buf)
+
+
+class RTC:
+    def memory(self, data=None):
+        global _rtc_mem
+        if data is None:
+            return bytes(_rtc_mem)
+        _rtc_mem = bytearray(data)
+
+
+class WDT:
+    def __init__(self, timeout=5000):
+        pass
+
+    def feed(self):
+        pass
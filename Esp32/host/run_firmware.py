@@ -0,0 +1,230 @@
+"""
+Arnés para ejecutar Esp32/main.py en CPython contra el emulador A7670
+
+    python run_firmware.py --publicaciones 3
+    python run_firmware.py --escala 0.1 --conectado     # arranque en caliente, 10x más rápido
+    python run_firmware.py --bajo-consumo --intervalo 60000 --publicaciones 5
+
+El firmware guarda sus archivos (certs.sha, cola.dat) en un directorio
+temporal que hace de flash, no en Esp32/.
+"""
+
+import argparse
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+AQUI = os.path.dirname(os.path.abspath(__file__))
+ESP32 = os.path.normpath(os.path.join(AQUI, ".."))
+MODULOS_SIMULADOS = ("machine", "dht", "framebuf", "micropython", "ubinascii")
+CERTIFICADOS = ("cacert.pem", "clientcert.pem", "clientkey.pem")
+# El emulador no valida TLS: si el certificado o la llave del cliente no están
+# en Esp32/certs (no se versionan) se usa este contenido
+PEM_SIMULADO = b"-----BEGIN CERTIFICATE-----\nU0lNVUxBRE8=\n-----END CERTIFICATE-----\n"
+
+
+class Detener(BaseException):
+    """Detiene el firmware desde el arnés (no la captura `except Exception`)"""
+
+
+def instalar_time(condicion_fin):
+    """Agrega la API de tiempo de MicroPython al módulo time de CPython.
+    Retorna una función que reinicia los ticks, como al despertar del deep sleep"""
+    t0 = [time.monotonic()]
+    dormir = time.sleep
+
+    def ticks_ms():
+        return int((time.monotonic() - t0[0]) * 1000)
+
+    def ticks_us():
+        return int((time.monotonic() - t0[0]) * 1000000)
+
+    def reiniciar():
+        t0[0] = time.monotonic()
+
+    def sleep(s):
+        if condicion_fin():
+            raise Detener()
+        dormir(s)
+
+    time.ticks_ms = ticks_ms
+    time.ticks_us = ticks_us
+    time.ticks_diff = lambda a, b: a - b
+    time.ticks_add = lambda a, b: a + b
+    time.sleep = sleep
+    time.sleep_ms = lambda ms: sleep(ms / 1000)
+    time.sleep_us = lambda us: sleep(us / 1000000)
+
+    if not hasattr(asyncio, "sleep_ms"):
+        asyncio.sleep_ms = lambda ms: asyncio.sleep(ms / 1000)
+    return reiniciar
+
+
+async def supervisar(coro, condicion_fin, eventos=()):
+    """Ejecuta el firmware hasta que se cumpla la condición de fin
+
+    eventos: [(segundos, callable)] que se disparan a esos tiempos
+    desde el arranque (p. ej. cortar y restaurar el enlace)
+    """
+    pendientes = sorted(eventos, key=lambda e: e[0])
+    t0 = time.monotonic()
+    tarea = asyncio.ensure_future(coro)
+    while not tarea.done():
+        if condicion_fin():
+            tarea.cancel()
+            break
+        while pendientes and time.monotonic() - t0 >= pendientes[0][0]:
+            pendientes.pop(0)[1]()
+        await asyncio.sleep(0.02)
+    try:
+        await tarea
+    except (asyncio.CancelledError, Detener):
+        pass
+
+
+def preparar(emulador, firmware_dir=None):
+    """Instala los módulos simulados y conecta el emulador a la UART"""
+    sys.path.insert(0, os.path.join(AQUI, "fakes"))
+    sys.path.insert(0, firmware_dir or ESP32)
+    # Registrarlos a mano para que tapen también a los módulos nativos
+    # (p. ej. machine en el puerto unix de MicroPython)
+    for nombre in MODULOS_SIMULADOS:
+        sys.modules.pop(nombre, None)
+        sys.modules[nombre] = __import__(nombre)
+    import machine
+    machine.modem = emulador
+    estado = {"v": 0}
+
+    def pwrkey(v):
+        # Flanco de bajada tras un pulso alto = pulsación de PWRKEY
+        if estado["v"] and not v:
+            emulador.pulso_pwrkey()
+        estado["v"] = v
+    machine.pin_hooks[4] = pwrkey
+
+    def power_en(v):
+        if not v:
+            emulador.apagar()
+    machine.pin_hooks[12] = power_en
+    machine.pin_hooks[25] = emulador.dtr
+
+
+def preparar_flash(directorio=None, firmware_dir=None):
+    """Crear el directorio que hace de flash con los certificados en certs/.
+    Retorna su ruta"""
+    directorio = directorio or tempfile.mkdtemp(prefix="esp32_flash_")
+    origen = os.path.join(firmware_dir or ESP32, "certs")
+    destino = os.path.join(directorio, "certs")
+    os.makedirs(destino, exist_ok=True)
+    for nombre in CERTIFICADOS:
+        ruta = os.path.join(origen, nombre)
+        if os.path.exists(ruta):
+            shutil.copy(ruta, destino)
+        elif not os.path.exists(os.path.join(destino, nombre)):
+            with open(os.path.join(destino, nombre), "wb") as f:
+                f.write(PEM_SIMULADO)
+    return directorio
+
+
+def main():
+    sys.path.insert(0, AQUI)
+    from a7670_emulator import A7670
+
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--publicaciones", type=int, default=2)
+    ap.add_argument("--escala", type=float, default=1.0)
+    ap.add_argument("--encendido", action="store_true")
+    ap.add_argument("--conectado", action="store_true",
+                    help="módem ya registrado, con PDP y sesión MQTT (arranque en caliente)")
+    ap.add_argument("--borrar-topic", action="store_true")
+    ap.add_argument("--ocupado", type=int, default=0, metavar="N",
+                    help="las N próximas publicaciones responden 'cliente ocupado' (+CMQTTPUB: 0,14)")
+    ap.add_argument("--latencia", action="append", default=[], metavar="CMD=MS",
+                    help="p. ej. AT+CMQTTPUB=800 (repetible)")
+    ap.add_argument("--fallo", action="append", default=[], metavar="CMD[:N]",
+                    help="los N próximos CMD responden ERROR (repetible)")
+    ap.add_argument("--corte", type=float, nargs=2, default=None, metavar=("DESDE_S", "DURACION_S"),
+                    help="cortar el enlace MQTT durante un intervalo")
+    ap.add_argument("--csq", type=int, default=None, help="señal que reporta AT+CSQ (0-31, 99)")
+    ap.add_argument("--senal", type=float, nargs=2, action="append", default=[], metavar=("DESDE_S", "CSQ"),
+                    help="cambiar la señal a CSQ en DESDE_S (repetible)")
+    ap.add_argument("--adaptativa", action="store_true",
+                    help="SENAL_ADAPTATIVA = True: juntar lecturas según la señal")
+    ap.add_argument("--bajo-consumo", action="store_true",
+                    help="BAJO_CONSUMO = True; el deep sleep dura lo pedido por --escala")
+    ap.add_argument("--intervalo", type=int, default=None, help="PUBLISH_INTERVAL y SAMPLE_INTERVAL (ms)")
+    ap.add_argument("--firmware", default=None, help="directorio con main.py (por defecto Esp32/)")
+    ap.add_argument("--flash", default=None, help="directorio que hace de flash (por defecto uno temporal)")
+    args = ap.parse_args()
+
+    latencias = {}
+    for item in args.latencia:
+        cmd, ms = item.split("=", 1)
+        latencias[cmd] = int(ms)
+    emu = A7670(latencias, escala=args.escala, encendido=args.encendido or args.conectado)
+    for item in args.fallo:
+        cmd, _, n = item.partition(":")
+        emu.inyectar_fallo(cmd, int(n or 1))
+    eventos = []
+    if args.corte:
+        desde, duracion = args.corte
+        eventos = [(desde, emu.cortar_enlace), (desde + duracion, emu.restaurar_enlace)]
+    if args.csq is not None:
+        emu.csq = args.csq
+    for desde, csq in args.senal:
+        eventos.append((desde, lambda csq=int(csq): setattr(emu, "csq", csq)))
+    if args.conectado:
+        emu.eco = False
+        emu.pdp = emu.gatt = emu.mqtt_iniciado = emu.conectado = True
+        emu.cliente = "ESP32_SENSORES_38182bf824ac"
+    emu.borrar_topic = args.borrar_topic
+    emu.pub_ocupado = args.ocupado
+    fin = lambda: len(emu.publicados) >= args.publicaciones
+    reiniciar_ticks = instalar_time(fin)
+    preparar(emu, args.firmware)
+    os.chdir(preparar_flash(args.flash, args.firmware))
+    t0 = time.monotonic()
+    import machine
+    despertares = 0
+    while True:
+        try:
+            import main as firmware
+            firmware.BAJO_CONSUMO = args.bajo_consumo
+            if args.adaptativa:
+                firmware.SENAL_ADAPTATIVA = True
+            if args.intervalo:
+                firmware.PUBLISH_INTERVAL = firmware.SAMPLE_INTERVAL = args.intervalo
+            if hasattr(firmware, "main_async"):
+                asyncio.run(supervisar(firmware.main_async(), fin, eventos))
+            else:
+                firmware.main()
+        except Detener:
+            pass
+        except machine.DeepSleep as e:
+            # Reiniciar el firmware como al despertar: solo queda la memoria RTC
+            despertares += 1
+            try:
+                time.sleep(e.ms * args.escala / 1000)
+            except Detener:
+                break
+            machine._reset_cause = machine.DEEPSLEEP_RESET
+            # ticks_ms() vuelve a contar desde 0 en cada arranque
+            reiniciar_ticks()
+            carpeta = os.path.abspath(args.firmware or ESP32)
+            for nombre, modulo in list(sys.modules.items()):
+                archivo = getattr(modulo, "__file__", None) or ""
+                if os.path.dirname(os.path.abspath(archivo)) == carpeta:
+                    sys.modules.pop(nombre)
+            continue
+        break
+    print("\n[arnés] %.1f s, %d publicados, %d despertares, rx=%d tx=%d" % (
+        time.monotonic() - t0, len(emu.publicados), despertares, emu.bytes_rx, emu.bytes_tx))
+    for topic, payload in emu.publicados:
+        print("[arnés]", topic, payload[:120])
+
+
+if __name__ == "__main__":
+    main()
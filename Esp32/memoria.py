@@ -0,0 +1,42 @@
+"""
+Medición del heap retenido (HEAP_CICLOS > 0 y LOG_CICLO en main.py). main.py
+lo importa solo si la medición está activa
+"""
+
+import gc
+
+fw = None   # Programa principal (main.py); lo asigna main.py al importar este módulo
+
+# Cada HEAP_CICLOS mensajes, justo después de publicar, se recolecta y se
+# mide el heap en uso. Las mediciones caen siempre en el mismo punto del
+# ciclo y ya sin basura, así que la diferencia entre dos seguidas es lo que
+# quedó retenido en esos mensajes: en régimen estable debe ser 0, y una fuga
+# aparece como crecimiento en una ventana tras otra. Recolectar solo una vez
+# cada HEAP_CICLOS evita un GC completo por publicación
+heap_usado = None
+heap_seq = None                # seq del mensaje tras el que se midió heap_usado
+heap_ventana = 0               # Mensajes entre las dos últimas mediciones
+heap_crecimiento = 0           # Bytes retenidos en esa ventana
+heap_ventanas_crecientes = 0   # Mediciones que dieron más heap que la anterior
+
+def medir(seq):
+    """Medir tras publicar seq si ya pasaron HEAP_CICLOS mensajes desde la
+    última medición. Retorna True si midió"""
+    global heap_usado, heap_seq, heap_ventana, heap_crecimiento, heap_ventanas_crecientes
+    if not hasattr(gc, "mem_alloc"):
+        return False
+    if heap_seq is not None and seq - heap_seq < fw.HEAP_CICLOS:
+        return False
+    gc.collect()
+    usado = gc.mem_alloc()
+    if heap_usado is not None:
+        heap_ventana = seq - heap_seq
+        heap_crecimiento = usado - heap_usado
+        if heap_crecimiento > 0:
+            heap_ventanas_crecientes += 1
+        print(f"🧠 Heap: {usado} B en uso, Δ {heap_crecimiento} B en {heap_ventana} mensajes")
+    else:
+        print(f"🧠 Heap: {usado} B en uso")
+    heap_usado = usado
+    heap_seq = seq
+    return True
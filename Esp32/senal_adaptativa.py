@@ -0,0 +1,50 @@
+"""
+Planificación según la señal (SENAL_ADAPTATIVA = True en main.py): clasifica
+el RSSI en buena / regular / mala y mide la señal cada SENAL_INTERVALO_MS;
+lote_objetivo() junta SENAL_LECTURAS[clase] lecturas por mensaje. main.py lo
+importa solo con la opción activa
+"""
+
+try:
+    import uasyncio as asyncio
+except ImportError:
+    import asyncio
+
+fw = None   # Programa principal (main.py); lo asigna main.py al importar este módulo
+
+def calidad_de(dbm, actual=None):
+    """Clasificar el RSSI; para salir de la clase actual hay que pasar el
+    umbral por más de SENAL_HISTERESIS_DB"""
+    if dbm is None:
+        return "desconocida"
+    m = fw.SENAL_HISTERESIS_DB
+    buena = fw.SENAL_BUENA_DBM
+    mala = fw.SENAL_MALA_DBM
+    # Los umbrales que limitan la clase actual se alejan m dB
+    if actual == "buena":
+        buena -= m
+    elif actual == "regular":
+        buena += m
+        mala -= m
+    elif actual == "mala":
+        mala += m
+    if dbm >= buena:
+        return "buena"
+    if dbm >= mala:
+        return "regular"
+    return "mala"
+
+def clasificar():
+    """Actualizar calidad_senal a partir de senal_rssi.
+    Retorna True si cambió de clase"""
+    anterior = fw.calidad_senal
+    fw.calidad_senal = calidad_de(fw.senal_rssi, anterior)
+    return fw.calidad_senal != anterior
+
+async def tarea():
+    """Medir la señal periódicamente mientras hay conexión"""
+    while True:
+        await asyncio.sleep_ms(fw.SENAL_INTERVALO_MS)
+        if fw._mqtt_conectado:
+            async with fw.modem_lock:
+                await fw.senal_medir()
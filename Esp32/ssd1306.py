@@ -24,9 +24,16 @@ SET_PRECHARGE = const(0xD9)
 SET_VCOM_DESEL = const(0xDB)
 SET_CHARGE_PUMP = const(0x8D)
 
+# longest command run sent in a single I2C transaction
+_CMD_BATCH = const(32)
+
 
 # Subclassing FrameBuffer provides support for graphics primitives
 # http://docs.micropython.org/en/latest/pyboard/library/framebuf.html
+#
+# Drawing methods are wrapped to record which 8-pixel pages they touched;
+# show() only sends those pages. Code that writes to self.buffer directly
+# must call invalidate() afterwards.
 class SSD1306(framebuf.FrameBuffer):
     def __init__(self, width, height, external_vcc):
         self.width = width
@@ -34,11 +41,87 @@ class SSD1306(framebuf.FrameBuffer):
         self.external_vcc = external_vcc
         self.pages = self.height // 8
         self.buffer = bytearray(self.pages * self.width)
+        self.buffer_mv = memoryview(self.buffer)
+        self.dirty = 0  # bit n set = page n changed since the last show()
+        self.cmd1 = bytearray(1)  # scratch for one- and two-byte commands
+        self.cmd2 = bytearray(2)
+        self.window = bytearray((SET_COL_ADDR, 0, 0, SET_PAGE_ADDR, 0, 0))
         super().__init__(self.buffer, self.width, self.height, framebuf.MONO_VLSB)
         self.init_display()
 
+    # dirty-page tracking
+    def invalidate(self, y0=0, y1=None):
+        """Mark the rows y0..y1 (inclusive) as needing a flush"""
+        if y1 is None:
+            y1 = self.height - 1
+        if y0 < 0:
+            y0 = 0
+        if y1 >= self.height:
+            y1 = self.height - 1
+        if y0 <= y1:
+            self.dirty |= ((1 << (y1 // 8 + 1)) - 1) & ~((1 << (y0 // 8)) - 1)
+
+    def fill(self, c):
+        super().fill(c)
+        self.dirty = (1 << self.pages) - 1
+
+    def pixel(self, x, y, c=None):
+        if c is None:
+            return super().pixel(x, y)
+        super().pixel(x, y, c)
+        self.invalidate(y, y)
+
+    def hline(self, x, y, w, c):
+        super().hline(x, y, w, c)
+        self.invalidate(y, y)
+
+    def vline(self, x, y, h, c):
+        super().vline(x, y, h, c)
+        self.invalidate(y, y + h - 1)
+
+    def line(self, x0, y0, x1, y1, c):
+        super().line(x0, y0, x1, y1, c)
+        self.invalidate(min(y0, y1), max(y0, y1))
+
+    def rect(self, x, y, w, h, c, *args):
+        super().rect(x, y, w, h, c, *args)
+        self.invalidate(y, y + h - 1)
+
+    def fill_rect(self, x, y, w, h, c):
+        super().fill_rect(x, y, w, h, c)
+        self.invalidate(y, y + h - 1)
+
+    def text(self, s, x, y, c=1):
+        super().text(s, x, y, c)
+        self.invalidate(y, y + 7)
+
+    def ellipse(self, x, y, xr, yr, c, *args):
+        super().ellipse(x, y, xr, yr, c, *args)
+        self.invalidate(y - yr, y + yr)
+
+    def poly(self, *args):
+        super().poly(*args)
+        self.invalidate()
+
+    def blit(self, *args):
+        super().blit(*args)
+        self.invalidate()
+
+    def scroll(self, xstep, ystep):
+        super().scroll(xstep, ystep)
+        self.invalidate()
+
+    def write_cmds(self, cmds):
+        """Send a sequence of command bytes; subclasses batch them"""
+        for cmd in cmds:
+            self.write_cmd(cmd)
+
+    def _cmd1(self, cmd):
+        self.cmd1[0] = cmd
+        self.write_cmds(self.cmd1)
+
     def init_display(self):
-        for cmd in (
+        self.write_cmds((
             SET_DISP,  # display off
             # address setting
             SET_MEM_ADDR,
@@ -71,29 +154,37 @@ class SSD1306(framebuf.FrameBuffer):
             SET_CHARGE_PUMP,
             0x10 if self.external_vcc else 0x14,
             SET_DISP | 0x01,  # display on
-        ):  # on
-            self.write_cmd(cmd)
+        ))
         self.fill(0)
         self.show()
 
     def poweroff(self):
-        self.write_cmd(SET_DISP)
+        self._cmd1(SET_DISP)
 
     def poweron(self):
-        self.write_cmd(SET_DISP | 0x01)
+        self._cmd1(SET_DISP | 0x01)
 
     def contrast(self, contrast):
-        self.write_cmd(SET_CONTRAST)
-        self.write_cmd(contrast)
+        self.cmd2[0] = SET_CONTRAST
+        self.cmd2[1] = contrast
+        self.write_cmds(self.cmd2)
 
     def invert(self, invert):
-        self.write_cmd(SET_NORM_INV | (invert & 1))
+        self._cmd1(SET_NORM_INV | (invert & 1))
 
     def rotate(self, rotate):
-        self.write_cmd(SET_COM_OUT_DIR | ((rotate & 1) << 3))
-        self.write_cmd(SET_SEG_REMAP | (rotate & 1))
+        self.cmd2[0] = SET_COM_OUT_DIR | ((rotate & 1) << 3)
+        self.cmd2[1] = SET_SEG_REMAP | (rotate & 1)
+        self.write_cmds(self.cmd2)
 
-    def show(self):
+    def show(self, full=False):
+        """Send the pages changed since the last call (all of them if full)"""
+        if full:
+            self.dirty = (1 << self.pages) - 1
+        dirty = self.dirty
+        if not dirty:
+            return
+        self.dirty = 0
         x0 = 0
         x1 = self.width - 1
         if self.width != 128:
@@ -101,13 +192,23 @@ class SSD1306(framebuf.FrameBuffer):
             col_offset = (128 - self.width) // 2
             x0 += col_offset
             x1 += col_offset
-        self.write_cmd(SET_COL_ADDR)
-        self.write_cmd(x0)
-        self.write_cmd(x1)
-        self.write_cmd(SET_PAGE_ADDR)
-        self.write_cmd(0)
-        self.write_cmd(self.pages - 1)
-        self.write_data(self.buffer)
+        page = 0
+        while page < self.pages:
+            if not dirty & (1 << page):
+                page += 1
+                continue
+            # contiguous run of dirty pages -> one window, one data write
+            last = page
+            while last + 1 < self.pages and dirty & (1 << (last + 1)):
+                last += 1
+            window = self.window
+            window[1] = x0
+            window[2] = x1
+            window[4] = page
+            window[5] = last
+            self.write_cmds(window)
+            self.write_data(self.buffer_mv[page * self.width:(last + 1) * self.width])
+            page = last + 1
 
 
 class SSD1306_I2C(SSD1306):
@@ -116,6 +217,9 @@ class SSD1306_I2C(SSD1306):
         self.addr = addr
         self.temp = bytearray(2)
         self.write_list = [b"\x40", None]  # Co=0, D/C#=1
+        # Co=0, D/C#=0: every byte after the control byte is a command
+        self.cmd_buf = bytearray(1 + _CMD_BATCH)
+        self.cmd_mv = memoryview(self.cmd_buf)
         super().__init__(width, height, external_vcc)
 
     def write_cmd(self, cmd):
@@ -123,14 +227,38 @@ class SSD1306_I2C(SSD1306):
         self.temp[1] = cmd
         self.i2c.writeto(self.addr, self.temp)
 
+    def write_cmds(self, cmds):
+        """Send the whole sequence in one transaction per _CMD_BATCH bytes"""
+        buf = self.cmd_buf
+        n = len(cmds)
+        i = 0
+        while i < n:
+            k = n - i
+            if k > _CMD_BATCH:
+                k = _CMD_BATCH
+            for j in range(k):
+                buf[1 + j] = cmds[i + j]
+            self.i2c.writeto(self.addr, self.cmd_mv[: 1 + k])
+            i += k
+
     def write_data(self, buf):
         self.write_list[1] = buf
         self.i2c.writevto(self.addr, self.write_list)
 
 
 class SSD1306_SPI(SSD1306):
-    def __init__(self, width, height, spi, dc, res, cs, external_vcc=False):
-        self.rate = 10 * 1024 * 1024
+    # id(bus) -> id() of the last SSD1306_SPI that configured it, so two
+    # panels sharing a bus re-initialise it only when they take turns. Only
+    # ids are kept: no reference keeps a panel alive (machine.SPI objects
+    # take no attributes), and a new panel always claims its bus in __init__
+    _bus_owner = {}
+
+    def __init__(self, width, height, spi, dc, res, cs, external_vcc=False,
+                 rate=10 * 1024 * 1024, shared=False):
+        # shared=True: other code also drives this bus (possibly with other
+        # settings), so configure it before every transfer
+        self.rate = rate
+        self.shared = shared
         dc.init(dc.OUT, value=0)
         res.init(res.OUT, value=0)
         cs.init(cs.OUT, value=1)
@@ -138,6 +266,11 @@ class SSD1306_SPI(SSD1306):
         self.dc = dc
         self.res = res
         self.cs = cs
+        self.cmd_buf = bytearray(_CMD_BATCH)
+        self.cmd_mv = memoryview(self.cmd_buf)
+        self.cmd_mv1 = self.cmd_mv[:1]  # single-command view, reused
+        self.spi.init(baudrate=self.rate, polarity=0, phase=0)
+        SSD1306_SPI._bus_owner[id(spi)] = id(self)
         import time
 
         self.res(1)
@@ -147,16 +280,39 @@ class SSD1306_SPI(SSD1306):
         self.res(1)
         super().__init__(width, height, external_vcc)
 
+    def _claim_bus(self):
+        if self.shared or SSD1306_SPI._bus_owner.get(id(self.spi)) != id(self):
+            self.spi.init(baudrate=self.rate, polarity=0, phase=0)
+            SSD1306_SPI._bus_owner[id(self.spi)] = id(self)
+
     def write_cmd(self, cmd):
-        self.spi.init(baudrate=self.rate, polarity=0, phase=0)
+        self.cmd_buf[0] = cmd
+        self.write_cmds(self.cmd_mv1)
+
+    def write_cmds(self, cmds):
+        """Send the whole sequence with CS held low"""
+        self._claim_bus()
         self.cs(1)
         self.dc(0)
         self.cs(0)
-        self.spi.write(bytearray([cmd]))
+        if isinstance(cmds, (bytes, bytearray, memoryview)):
+            self.spi.write(cmds)
+        else:
+            buf = self.cmd_buf
+            n = len(cmds)
+            i = 0
+            while i < n:
+                k = n - i
+                if k > _CMD_BATCH:
+                    k = _CMD_BATCH
+                for j in range(k):
+                    buf[j] = cmds[i + j]
+                self.spi.write(self.cmd_mv[:k])
+                i += k
         self.cs(1)
 
     def write_data(self, buf):
-        self.spi.init(baudrate=self.rate, polarity=0, phase=0)
+        self._claim_bus()
         self.cs(1)
         self.dc(1)
         self.cs(0)